@@ -0,0 +1,96 @@
+"""Benchmark the feature update endpoints
+
+Run from the application directory:
+
+    uv run python benchmarks/bench_features.py
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from brewing.api import app
+
+BODY = "<p>Users sign in with their email address and a password.</p>\n" * 200
+
+
+def timed(label: str, iterations: int, run) -> None:
+    """Run a callable repeatedly and print the mean time per call"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        run(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed / iterations * 1000:8.2f} ms/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as project_dir:
+        (Path(project_dir) / ".brewing").mkdir()
+        os.chdir(project_dir)
+        client = TestClient(app)
+
+        features = []
+        for i in range(args.features):
+            feature = client.post("/features", json={"name": f"Feature {i}"})
+            feature = feature.json()["data"]
+            features.append(
+                client.put(
+                    "/features:batch",
+                    json={"data": [{"id": feature["id"], "draft_content": BODY}]},
+                ).json()["data"][0]
+            )
+        feature = features[0]
+
+        timed(
+            "PUT /features/{id} (no-op)",
+            args.iterations,
+            lambda i: client.put(f"/features/{feature['id']}", json=feature),
+        )
+        timed(
+            "PUT /features/{id} (draft edit)",
+            args.iterations,
+            lambda i: client.put(
+                f"/features/{feature['id']}", json={"draft_content": f"{BODY}{i}"}
+            ),
+        )
+
+        def put_each(i):
+            for feature in features:
+                client.put(
+                    f"/features/{feature['id']}",
+                    json={"draft_content": f"{BODY}each-{i}"},
+                )
+
+        def put_batch(i):
+            client.put(
+                "/features:batch",
+                json={
+                    "data": [
+                        {"id": feature["id"], "draft_content": f"{BODY}batch-{i}"}
+                        for feature in features
+                    ]
+                },
+            )
+
+        iterations = max(1, args.iterations // args.features)
+        timed(f"{args.features} x PUT /features/{{id}}", iterations, put_each)
+        timed(f"PUT /features:batch ({args.features})", iterations, put_batch)
+        stored = client.get("/features").json()["data"]
+        timed(
+            f"PUT /features:batch ({args.features}, no-op)",
+            iterations,
+            lambda i: client.put("/features:batch", json={"data": stored}),
+        )
+
+
+if __name__ == "__main__":
+    main()
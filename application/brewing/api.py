@@ -3,13 +3,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+from functools import lru_cache
 import uuid
 import json
 import subprocess
 import os
 from pathlib import Path
 from sqlalchemy.orm import Session
-from brewing.models import Feature as FeatureModel, create_database_engine
+from brewing.models import (
+    Feature as FeatureModel,
+    create_database_engine,
+    hash_content,
+    init_database,
+    prune_content_blobs,
+    store_content,
+)
 import openai
 
 
@@ -55,6 +63,9 @@ class FeatureUpdate(BaseModel):
 
 class Feature(FeatureBase):
     id: str = Field(..., description="Feature ID (UUID v4)")
+    draft_matches_content: bool = Field(
+        ..., description="Whether the draft is identical to the published content"
+    )
     date_published: Optional[str] = Field(
         None, description="The date the feature was last published"
     )
@@ -62,6 +73,10 @@ class Feature(FeatureBase):
     date_updated: str = Field(..., description="The date the feature was last updated")
 
 
+class FeatureBatchUpdate(FeatureUpdate):
+    id: str = Field(..., description="Feature ID (UUID v4)")
+
+
 class ProjectUpdate(BaseModel):
     onboarded: bool = Field(..., description="Whether the project has been onboarded")
     name: Optional[str] = Field(None, description="Project name")
@@ -83,14 +98,30 @@ class UpdateFeatureResponse(BaseModel):
     data: Feature
 
 
+class BatchUpdateFeaturesRequest(BaseModel):
+    data: List[FeatureBatchUpdate]
+
+
+class BatchUpdateFeaturesResponse(BaseModel):
+    data: List[Feature]
+
+
 # Database session dependency
+@lru_cache(maxsize=None)
+def get_session_factory(brewing_dir: str):
+    """Get the session factory for a project, migrating its database once"""
+    init_database(brewing_dir)
+    _, SessionLocal = create_database_engine(brewing_dir)
+    return SessionLocal
+
+
 def get_db():
     """Get database session"""
     brewing_dir = Path.cwd() / ".brewing"
     if not brewing_dir.exists():
         raise HTTPException(status_code=404, detail="Project not found")
 
-    _, SessionLocal = create_database_engine(str(brewing_dir))
+    SessionLocal = get_session_factory(str(brewing_dir))
     db = SessionLocal()
     try:
         yield db
@@ -263,6 +294,71 @@ def save_project_config(config: dict) -> dict:
         )
 
 
+def apply_feature_update(db: Session, feature: FeatureModel, feature_update):
+    """Apply the provided fields of an update to a feature
+
+    Fields matching the stored values are left untouched. Returns whether the
+    feature changed and the content hashes it no longer references.
+    """
+    changed = False
+    replaced_hashes = set()
+
+    # Compare against the assigned blobs, as the hash columns are only
+    # updated on flush
+    content_hash = feature.content_blob.hash if feature.content_blob else None
+    draft_content_hash = (
+        feature.draft_content_blob.hash if feature.draft_content_blob else None
+    )
+
+    # Update fields if provided
+    for field in ("name", "emoji", "summary"):
+        value = getattr(feature_update, field)
+        if value is not None and value != getattr(feature, field):
+            setattr(feature, field, value)
+            changed = True
+    # Content is stored by hash, so unchanged bodies are not rewritten
+    if (
+        feature_update.content is not None
+        and hash_content(feature_update.content) != content_hash
+    ):
+        replaced_hashes.add(content_hash)
+        feature.content_blob = store_content(db, feature_update.content)
+        changed = True
+    if (
+        feature_update.draft_content is not None
+        and hash_content(feature_update.draft_content) != draft_content_hash
+    ):
+        replaced_hashes.add(draft_content_hash)
+        feature.draft_content_blob = store_content(db, feature_update.draft_content)
+        changed = True
+
+    if changed:
+        # Update the timestamp
+        feature.date_updated = datetime.utcnow()
+
+    return changed, replaced_hashes
+
+
+def apply_content_change(old_content: str, new_content: str) -> None:
+    """Write published content to product.md and update the codebase to match"""
+    try:
+        # Write content to product.md
+        write_product_md(new_content)
+
+        # Generate LLM summary of changes
+        changes_summary = generate_llm_summary(old_content or "", new_content)
+
+        # Run cursor-agent to modify codebase
+        print(
+            f"Running cursor-agent to modify codebase with changes summary: {changes_summary}"
+        )
+        run_cursor_agent(changes_summary)
+
+    except Exception as e:
+        print(f"Error in LLM integration: {e}")
+        # Continue with the update even if LLM integration fails
+
+
 # API Endpoints
 @app.get(
     "/project",
@@ -296,11 +392,15 @@ async def update_project(project_update: ProjectUpdate):
 
 
 @app.get("/features", response_model=ListFeaturesResponse, summary="List all features")
-async def list_features(db: Session = Depends(get_db)):
-    """Get all features without pagination"""
+async def list_features(collapse_draft: bool = False, db: Session = Depends(get_db)):
+    """Get all features without pagination
+
+    With `collapse_draft`, `draft_content` is omitted for features whose draft
+    matches the published content.
+    """
     features = db.query(FeatureModel).all()
     return ListFeaturesResponse(
-        data=[Feature(**feature.to_dict()) for feature in features]
+        data=[Feature(**feature.to_dict(collapse_draft)) for feature in features]
     )
 
 
@@ -319,8 +419,8 @@ async def create_feature(feature: FeatureCreate, db: Session = Depends(get_db)):
         name=feature.name,
         emoji=feature.emoji,
         summary=None,
-        content="",
-        draft_content="",
+        content_blob=store_content(db, ""),
+        draft_content_blob=store_content(db, ""),
         date_published=None,
         date_created=now,
         date_updated=now,
@@ -336,12 +436,18 @@ async def create_feature(feature: FeatureCreate, db: Session = Depends(get_db)):
 @app.get(
     "/features/{feature_id}", response_model=GetFeatureResponse, summary="Get a feature"
 )
-async def get_feature(feature_id: str, db: Session = Depends(get_db)):
-    """Get a single feature by ID"""
+async def get_feature(
+    feature_id: str, collapse_draft: bool = False, db: Session = Depends(get_db)
+):
+    """Get a single feature by ID
+
+    With `collapse_draft`, `draft_content` is omitted when the draft matches
+    the published content.
+    """
     feature = db.query(FeatureModel).filter(FeatureModel.id == feature_id).first()
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
-    return GetFeatureResponse(data=Feature(**feature.to_dict()))
+    return GetFeatureResponse(data=Feature(**feature.to_dict(collapse_draft)))
 
 
 @app.put(
@@ -352,7 +458,12 @@ async def get_feature(feature_id: str, db: Session = Depends(get_db)):
 async def update_feature(
     feature_id: str, feature_update: FeatureUpdate, db: Session = Depends(get_db)
 ):
-    """Update a feature by ID. All feature fields are provided."""
+    """Update a feature by ID. All feature fields are provided.
+
+    Updates that match the stored feature return it without writing. When the
+    published content changes, product.md and the codebase are updated after
+    the feature is committed.
+    """
     feature = db.query(FeatureModel).filter(FeatureModel.id == feature_id).first()
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
@@ -360,46 +471,93 @@ async def update_feature(
     # Store old content for comparison
     old_content = feature.content
 
-    # Update fields if provided
-    if feature_update.name is not None:
-        feature.name = feature_update.name
-    if feature_update.emoji is not None:
-        feature.emoji = feature_update.emoji
-    if feature_update.summary is not None:
-        feature.summary = feature_update.summary
-    if feature_update.content is not None:
-        feature.content = feature_update.content
-    if feature_update.draft_content is not None:
-        feature.draft_content = feature_update.draft_content
-
-    # Update the timestamp
-    feature.date_updated = datetime.utcnow()
-
-    # Check if content changed and trigger LLM integration
-    if feature_update.content is not None and feature_update.content != old_content:
-        try:
-            # Write content to product.md
-            write_product_md(feature_update.content)
-
-            # Generate LLM summary of changes
-            changes_summary = generate_llm_summary(
-                old_content or "", feature_update.content
-            )
-
-            # Run cursor-agent to modify codebase
-            print(
-                f"Running cursor-agent to modify codebase with changes summary: {changes_summary}"
-            )
-            run_cursor_agent(changes_summary)
-
-        except Exception as e:
-            print(f"Error in LLM integration: {e}")
-            # Continue with the update even if LLM integration fails
+    changed, replaced_hashes = apply_feature_update(db, feature, feature_update)
+
+    # Build the response from in-memory state rather than re-reading the row
+    response = UpdateFeatureResponse(data=Feature(**feature.to_dict()))
+    if not changed:
+        return response
+
+    if replaced_hashes:
+        db.flush()
+        prune_content_blobs(db, replaced_hashes)
+    db.commit()
+
+    # Trigger LLM integration outside the transaction
+    new_content = response.data.content
+    if new_content != old_content:
+        apply_content_change(old_content, new_content)
+
+    return response
+
+
+@app.put(
+    "/features:batch",
+    response_model=BatchUpdateFeaturesResponse,
+    summary="Update many features",
+)
+async def batch_update_features(
+    batch_update: BatchUpdateFeaturesRequest, db: Session = Depends(get_db)
+):
+    """Update many features by ID in a single transaction.
+
+    Nothing is written if any of the features does not exist. Batch updates
+    cannot change published content, as publishing writes product.md and runs
+    cursor-agent; publish a feature through `PUT /features/{feature_id}`.
+    """
+    feature_ids = {feature_update.id for feature_update in batch_update.data}
+    features = {
+        feature.id: feature
+        for feature in db.query(FeatureModel)
+        .filter(FeatureModel.id.in_(feature_ids))
+        .all()
+    }
+    missing = feature_ids - features.keys()
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Features not found: {', '.join(sorted(missing))}"
+        )
+
+    publishing = sorted(
+        {
+            feature_update.id
+            for feature_update in batch_update.data
+            if feature_update.content is not None
+            and hash_content(feature_update.content)
+            != features[feature_update.id].content_hash
+        }
+    )
+    if publishing:
+        raise HTTPException(
+            status_code=422,
+            detail="Published content cannot be changed in a batch: "
+            f"{', '.join(publishing)}",
+        )
+
+    any_changed = False
+    replaced_hashes = set()
+    for feature_update in batch_update.data:
+        changed, feature_replaced_hashes = apply_feature_update(
+            db, features[feature_update.id], feature_update
+        )
+        any_changed = any_changed or changed
+        replaced_hashes |= feature_replaced_hashes
+
+    response = BatchUpdateFeaturesResponse(
+        data=[
+            Feature(**features[feature_update.id].to_dict())
+            for feature_update in batch_update.data
+        ]
+    )
+    if not any_changed:
+        return response
 
+    if replaced_hashes:
+        db.flush()
+        prune_content_blobs(db, replaced_hashes)
     db.commit()
-    db.refresh(feature)
 
-    return UpdateFeatureResponse(data=Feature(**feature.to_dict()))
+    return response
 
 
 @app.delete("/features/{feature_id}", status_code=204, summary="Delete a feature")
@@ -409,7 +567,10 @@ async def delete_feature(feature_id: str, db: Session = Depends(get_db)):
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
 
+    content_hashes = {feature.content_hash, feature.draft_content_hash}
     db.delete(feature)
+    db.flush()
+    prune_content_blobs(db, content_hashes)
     db.commit()
     return None
 
@@ -1,13 +1,106 @@
 """Database models for the Brew CLI tool"""
 
-from sqlalchemy import Column, String, DateTime, Text, create_engine
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    Text,
+    LargeBinary,
+    ForeignKey,
+    create_engine,
+    inspect,
+    select,
+    text,
+    union,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
+from functools import cached_property
+from typing import Iterable, Optional
+import hashlib
+import os
 import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
 
 Base = declarative_base()
 
+# Compression applied to newly stored content blobs ("none", "zlib" or "zstd")
+CONTENT_COMPRESSION = os.getenv("BREWING_CONTENT_COMPRESSION", "zlib")
+
+
+def hash_content(content: str) -> str:
+    """Get the content address (SHA-256 hex digest) of a body of text"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def validate_compression(compression: str) -> None:
+    """Check that a content compression setting can be used"""
+    if compression not in ("none", "zlib", "zstd"):
+        raise ValueError(f"Unknown content compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError(
+            "zstd compression requires the zstandard package "
+            "(install the `zstd` extra)"
+        )
+
+
+def compress_content(content: str, compression: Optional[str] = None):
+    """Encode text for storage, returning the compression used and the bytes
+
+    Falls back to storing the raw bytes when compression does not make the
+    body any smaller.
+    """
+    compression = compression or CONTENT_COMPRESSION
+    validate_compression(compression)
+    raw = content.encode("utf-8")
+
+    if compression == "none":
+        return "none", raw
+    if compression == "zstd":
+        data = zstandard.ZstdCompressor().compress(raw)
+    else:
+        data = zlib.compress(raw)
+
+    if len(data) >= len(raw):
+        return "none", raw
+    return compression, data
+
+
+def decompress_content(compression: str, data: bytes) -> str:
+    """Decode stored bytes back into text"""
+    if compression == "zlib":
+        data = zlib.decompress(data)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "Content is zstd compressed but the zstandard package is not installed"
+            )
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif compression != "none":
+        raise ValueError(f"Unknown content compression: {compression}")
+    return data.decode("utf-8")
+
+
+class ContentBlob(Base):
+    """Content-addressed body of text shared by any feature referencing it"""
+
+    __tablename__ = "content_blobs"
+
+    hash = Column(String, primary_key=True)
+    compression = Column(String, nullable=False, default="none")
+    data = Column(LargeBinary, nullable=False)
+
+    @cached_property
+    def text(self) -> str:
+        """Decompressed text, cached for the lifetime of the instance"""
+        return decompress_content(self.compression, self.data)
+
 
 class Feature(Base):
     """Feature model representing a product feature"""
@@ -18,21 +111,58 @@ class Feature(Base):
     emoji = Column(String, nullable=True)
     name = Column(Text, nullable=False)
     summary = Column(Text, nullable=True)
-    content = Column(Text, nullable=True)
-    draft_content = Column(Text, nullable=True)
+    content_hash = Column(
+        String, ForeignKey("content_blobs.hash"), nullable=True, index=True
+    )
+    draft_content_hash = Column(
+        String, ForeignKey("content_blobs.hash"), nullable=True, index=True
+    )
     date_published = Column(DateTime, nullable=True)
     date_updated = Column(DateTime, nullable=False, default=datetime.utcnow)
     date_created = Column(DateTime, nullable=False, default=datetime.utcnow)
 
-    def to_dict(self):
-        """Convert model to dictionary"""
+    content_blob = relationship(ContentBlob, foreign_keys=[content_hash], lazy="joined")
+    draft_content_blob = relationship(
+        ContentBlob, foreign_keys=[draft_content_hash], lazy="joined"
+    )
+
+    @property
+    def content(self):
+        """The published specification content"""
+        return self.content_blob.text if self.content_blob else None
+
+    @property
+    def draft_content(self):
+        """The unpublished specification content"""
+        return self.draft_content_blob.text if self.draft_content_blob else None
+
+    @property
+    def draft_matches_content(self) -> bool:
+        """Whether the draft is identical to the published content"""
+        # Compare the blobs, as the hash columns are only updated on flush
+        content_hash = self.content_blob.hash if self.content_blob else None
+        draft_content_hash = (
+            self.draft_content_blob.hash if self.draft_content_blob else None
+        )
+        return content_hash == draft_content_hash
+
+    def to_dict(self, collapse_draft: bool = False):
+        """Convert model to dictionary
+
+        With ``collapse_draft`` the draft body is omitted when it is identical
+        to the published content, as signalled by ``draft_matches_content``.
+        """
+        draft_matches_content = self.draft_matches_content
         return {
             "id": self.id,
             "emoji": self.emoji,
             "name": self.name,
             "summary": self.summary,
             "content": self.content,
-            "draft_content": self.draft_content,
+            "draft_content": None
+            if collapse_draft and draft_matches_content
+            else self.draft_content,
+            "draft_matches_content": draft_matches_content,
             "date_published": self.date_published.isoformat()
             if self.date_published
             else None,
@@ -41,6 +171,116 @@ class Feature(Base):
         }
 
 
+def store_content(db, content):
+    """Get the blob for a body of text, adding it to the session if it is new
+
+    New blobs are only added to the session, so nothing is written until the
+    caller flushes or commits.
+    """
+    if content is None:
+        return None
+
+    content_hash = hash_content(content)
+    for pending in db.new:
+        if isinstance(pending, ContentBlob) and pending.hash == content_hash:
+            return pending
+
+    blob = db.get(ContentBlob, content_hash)
+    if blob is None:
+        compression, data = compress_content(content)
+        blob = ContentBlob(hash=content_hash, compression=compression, data=data)
+        # Seed the cached text so responses don't decompress what was just stored
+        blob.__dict__["text"] = content
+        db.add(blob)
+    return blob
+
+
+def prune_content_blobs(db, hashes: Optional[Iterable[str]] = None) -> int:
+    """Delete content blobs no longer referenced by any feature
+
+    When ``hashes`` is given only those blobs are considered, which avoids
+    scanning every blob when a single feature changes.
+    """
+    content_hash = Feature.content_hash
+    draft_content_hash = Feature.draft_content_hash
+
+    if hashes is None:
+        candidates = ContentBlob.hash.isnot(None)
+        referenced = union(
+            select(content_hash).where(content_hash.isnot(None)),
+            select(draft_content_hash).where(draft_content_hash.isnot(None)),
+        )
+    else:
+        hashes = {blob_hash for blob_hash in hashes if blob_hash is not None}
+        if not hashes:
+            return 0
+        candidates = ContentBlob.hash.in_(hashes)
+        referenced = union(
+            select(content_hash).where(content_hash.in_(hashes)),
+            select(draft_content_hash).where(draft_content_hash.in_(hashes)),
+        )
+
+    return (
+        db.query(ContentBlob)
+        .filter(candidates, ContentBlob.hash.notin_(referenced))
+        .delete(synchronize_session=False)
+    )
+
+
+def migrate_inline_content(engine):
+    """Move content stored inline on features into the content blob table
+
+    Databases created before content was deduplicated keep the bodies in
+    ``features.content`` and ``features.draft_content``. Those columns are
+    emptied once their bodies have been moved into blobs.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("features")}
+    if "content_hash" in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE features ADD COLUMN content_hash VARCHAR"))
+        connection.execute(
+            text("ALTER TABLE features ADD COLUMN draft_content_hash VARCHAR")
+        )
+        if not {"content", "draft_content"} <= columns:
+            return
+
+        rows = connection.execute(
+            text("SELECT id, content, draft_content FROM features")
+        ).all()
+        stored = set()
+        for feature_id, content, draft_content in rows:
+            hashes = {}
+            for key, body in (("content", content), ("draft_content", draft_content)):
+                if body is None:
+                    hashes[key] = None
+                    continue
+                hashes[key] = hash_content(body)
+                if hashes[key] not in stored:
+                    compression, data = compress_content(body)
+                    connection.execute(
+                        ContentBlob.__table__.insert().values(
+                            hash=hashes[key], compression=compression, data=data
+                        )
+                    )
+                    stored.add(hashes[key])
+            connection.execute(
+                text(
+                    "UPDATE features SET content_hash = :content, "
+                    "draft_content_hash = :draft_content, "
+                    "content = NULL, draft_content = NULL WHERE id = :id"
+                ),
+                {**hashes, "id": feature_id},
+            )
+
+
+def create_feature_indexes(engine):
+    """Create feature indexes missing from tables created by an older schema"""
+    for index in Feature.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
 def get_database_url(brewing_dir: str) -> str:
     """Get the database URL for the project"""
     return f"sqlite:///{brewing_dir}/database.db"
@@ -56,6 +296,10 @@ def create_database_engine(brewing_dir: str):
 
 def init_database(brewing_dir: str):
     """Initialize the database with tables"""
+    # Fail on a bad compression setting before any content is written
+    validate_compression(CONTENT_COMPRESSION)
     engine, _ = create_database_engine(brewing_dir)
     Base.metadata.create_all(bind=engine)
+    migrate_inline_content(engine)
+    create_feature_indexes(engine)
     return engine
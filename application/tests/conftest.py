@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from brewing import api
+
+
+@pytest.fixture
+def brewing_dir(tmp_path, monkeypatch):
+    """An empty project directory used as the working directory"""
+    monkeypatch.chdir(tmp_path)
+    brewing_dir = tmp_path / ".brewing"
+    brewing_dir.mkdir()
+    return brewing_dir
+
+
+@pytest.fixture
+def content_changes(monkeypatch):
+    """Record LLM integration runs instead of calling OpenAI and cursor-agent"""
+    changes = []
+    monkeypatch.setattr(
+        api, "apply_content_change", lambda old, new: changes.append((old, new))
+    )
+    return changes
+
+
+@pytest.fixture
+def client(brewing_dir, content_changes):
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def feature(client):
+    return client.post("/features", json={"name": "Login"}).json()["data"]
@@ -0,0 +1,171 @@
+import sqlite3
+
+
+def count_blobs(brewing_dir):
+    connection = sqlite3.connect(brewing_dir / "database.db")
+    (count,) = connection.execute("SELECT COUNT(*) FROM content_blobs").fetchone()
+    connection.close()
+    return count
+
+
+class TestContentStorage:
+    def test_new_feature_shares_empty_blob(self, client, brewing_dir, feature):
+        assert feature["content"] == feature["draft_content"] == ""
+        assert feature["draft_matches_content"]
+        assert count_blobs(brewing_dir) == 1
+
+    def test_collapse_draft(self, client, feature):
+        client.put(
+            f"/features/{feature['id']}", json={"content": "A", "draft_content": "A"}
+        )
+
+        data = client.get(f"/features/{feature['id']}?collapse_draft=true").json()
+        assert data["data"]["draft_content"] is None
+        assert data["data"]["draft_matches_content"]
+        data = client.get("/features?collapse_draft=true").json()
+        assert data["data"][0]["draft_content"] is None
+
+        data = client.get(f"/features/{feature['id']}").json()
+        assert data["data"]["draft_content"] == "A"
+
+    def test_collapse_draft_keeps_differing_draft(self, client, feature):
+        client.put(f"/features/{feature['id']}", json={"draft_content": "B"})
+
+        data = client.get(f"/features/{feature['id']}?collapse_draft=true").json()
+        assert data["data"]["draft_content"] == "B"
+        assert not data["data"]["draft_matches_content"]
+
+    def test_replaced_blobs_are_pruned(self, client, brewing_dir, feature):
+        client.put(
+            f"/features/{feature['id']}", json={"content": "A", "draft_content": "B"}
+        )
+        assert count_blobs(brewing_dir) == 2
+
+        client.delete(f"/features/{feature['id']}")
+        assert count_blobs(brewing_dir) == 0
+
+    def test_delete_keeps_shared_blobs(self, client, brewing_dir, feature):
+        other = client.post("/features", json={"name": "Signup"}).json()["data"]
+        client.put(f"/features/{feature['id']}", json={"draft_content": "A"})
+
+        client.delete(f"/features/{feature['id']}")
+        assert count_blobs(brewing_dir) == 1
+        data = client.get(f"/features/{other['id']}").json()["data"]
+        assert data["content"] == ""
+
+
+class TestUpdateFeature:
+    def test_no_op_update_does_not_write(self, client, feature, content_changes):
+        response = client.put(f"/features/{feature['id']}", json=feature)
+
+        assert response.status_code == 200
+        assert response.json()["data"] == feature
+        data = client.get(f"/features/{feature['id']}").json()["data"]
+        assert data["date_updated"] == feature["date_updated"]
+        assert content_changes == []
+
+    def test_update_returns_stored_feature(self, client, feature):
+        response = client.put(
+            f"/features/{feature['id']}", json={"name": "Sign in", "draft_content": "B"}
+        )
+
+        data = response.json()["data"]
+        assert data["name"] == "Sign in"
+        assert data["draft_content"] == "B"
+        assert data["date_updated"] != feature["date_updated"]
+        assert client.get(f"/features/{feature['id']}").json()["data"] == data
+
+    def test_publishing_applies_content_change(self, client, feature, content_changes):
+        client.put(f"/features/{feature['id']}", json={"content": "A"})
+        client.put(f"/features/{feature['id']}", json={"content": "A"})
+
+        assert content_changes == [("", "A")]
+
+    def test_missing_feature(self, client):
+        response = client.put("/features/missing", json={"name": "Login"})
+        assert response.status_code == 404
+
+
+class TestBatchUpdateFeatures:
+    def test_updates_features(self, client, feature, content_changes):
+        other = client.post("/features", json={"name": "Signup"}).json()["data"]
+
+        response = client.put(
+            "/features:batch",
+            json={
+                "data": [
+                    {"id": feature["id"], "draft_content": "A"},
+                    {"id": other["id"], "name": "Register"},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json()["data"] == client.get("/features").json()["data"]
+        assert [item["draft_content"] for item in response.json()["data"]] == [
+            "A",
+            "",
+        ]
+        assert [item["name"] for item in response.json()["data"]] == [
+            "Login",
+            "Register",
+        ]
+        assert content_changes == []
+
+    def test_missing_feature_writes_nothing(self, client, feature):
+        response = client.put(
+            "/features:batch",
+            json={
+                "data": [
+                    {"id": feature["id"], "name": "Sign in"},
+                    {"id": "missing", "name": "Register"},
+                ]
+            },
+        )
+
+        assert response.status_code == 404
+        assert client.get(f"/features/{feature['id']}").json()["data"] == feature
+
+    def test_changing_published_content_is_rejected(
+        self, client, feature, content_changes
+    ):
+        response = client.put(
+            "/features:batch",
+            json={
+                "data": [
+                    {"id": feature["id"], "draft_content": "A"},
+                    {"id": feature["id"], "content": "A"},
+                ]
+            },
+        )
+
+        assert response.status_code == 422
+        assert client.get(f"/features/{feature['id']}").json()["data"] == feature
+        assert content_changes == []
+
+    def test_no_op_batch_does_not_write(self, client, feature):
+        response = client.put("/features:batch", json={"data": [feature]})
+
+        assert response.json()["data"] == [feature]
+        data = client.get(f"/features/{feature['id']}").json()["data"]
+        assert data["date_updated"] == feature["date_updated"]
+
+    def test_repeated_feature_applies_updates_in_order(self, client, feature):
+        client.put(f"/features/{feature['id']}", json={"draft_content": "A"})
+
+        response = client.put(
+            "/features:batch",
+            json={
+                "data": [
+                    {"id": feature["id"], "draft_content": "B"},
+                    {"id": feature["id"], "draft_content": "A"},
+                ]
+            },
+        )
+
+        assert [item["draft_content"] for item in response.json()["data"]] == [
+            "A",
+            "A",
+        ]
+        data = client.get(f"/features/{feature['id']}").json()["data"]
+        assert data["draft_content"] == "A"
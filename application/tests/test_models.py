@@ -0,0 +1,135 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from brewing import models
+from brewing.models import (
+    ContentBlob,
+    Feature,
+    compress_content,
+    decompress_content,
+    hash_content,
+    init_database,
+    prune_content_blobs,
+    store_content,
+)
+
+BODY = "# Login\n\nUsers sign in with email and password.\n" * 100
+
+
+def create_legacy_database(brewing_dir):
+    """Create a database using the schema with inline feature content"""
+    connection = sqlite3.connect(brewing_dir / "database.db")
+    connection.execute(
+        "CREATE TABLE features (id VARCHAR PRIMARY KEY, emoji VARCHAR, "
+        "name TEXT NOT NULL, summary TEXT, content TEXT, draft_content TEXT, "
+        "date_published DATETIME, date_updated DATETIME NOT NULL, "
+        "date_created DATETIME NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO features VALUES (?, NULL, ?, NULL, ?, ?, NULL, "
+        "'2024-01-01 00:00:00', '2024-01-01 00:00:00')",
+        [
+            ("published", "Published", BODY, BODY),
+            ("edited", "Edited", BODY, BODY + "More"),
+            ("empty", "Empty", None, None),
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def session(brewing_dir):
+    engine = init_database(str(brewing_dir))
+    db = sessionmaker(autoflush=False, bind=engine)()
+    yield db
+    db.close()
+
+
+class TestCompression:
+    @pytest.mark.parametrize("compression", ["none", "zlib"])
+    def test_round_trip(self, compression):
+        stored_compression, data = compress_content(BODY, compression)
+        assert stored_compression == compression
+        assert decompress_content(stored_compression, data) == BODY
+
+    def test_stores_raw_bytes_when_compression_does_not_help(self):
+        assert compress_content("hi", "zlib") == ("none", b"hi")
+
+    def test_zstd_without_zstandard_fails(self, monkeypatch):
+        monkeypatch.setattr(models, "zstandard", None)
+        with pytest.raises(RuntimeError):
+            compress_content(BODY, "zstd")
+
+    def test_unknown_compression_fails(self):
+        with pytest.raises(ValueError):
+            compress_content(BODY, "lzma")
+        with pytest.raises(ValueError):
+            decompress_content("lzma", b"")
+
+    def test_bad_setting_fails_on_init(self, brewing_dir, monkeypatch):
+        monkeypatch.setattr(models, "CONTENT_COMPRESSION", "lzma")
+        with pytest.raises(ValueError):
+            init_database(str(brewing_dir))
+
+
+class TestContentBlobs:
+    def test_store_content_reuses_pending_blob(self, session):
+        blob = store_content(session, BODY)
+        assert store_content(session, BODY) is blob
+        session.commit()
+        assert session.query(ContentBlob).count() == 1
+
+    def test_store_content_caches_text(self, session, monkeypatch):
+        blob = store_content(session, BODY)
+        monkeypatch.setattr(models, "decompress_content", None)
+        assert blob.text == BODY
+
+    def test_store_content_does_not_write(self, session):
+        store_content(session, BODY)
+        session.rollback()
+        assert session.query(ContentBlob).count() == 0
+
+    def test_prune_only_given_hashes(self, session):
+        kept = store_content(session, "kept")
+        store_content(session, "orphan")
+        session.add(Feature(name="Login", content_blob=kept, draft_content_blob=kept))
+        session.commit()
+
+        assert prune_content_blobs(session, [hash_content("unrelated")]) == 0
+        assert prune_content_blobs(session, [kept.hash]) == 0
+        assert prune_content_blobs(session) == 1
+        assert [blob.hash for blob in session.query(ContentBlob)] == [kept.hash]
+
+
+class TestMigration:
+    def test_moves_inline_content_into_blobs(self, brewing_dir):
+        create_legacy_database(brewing_dir)
+        engine = init_database(str(brewing_dir))
+        db = sessionmaker(bind=engine)()
+
+        features = {feature.id: feature for feature in db.query(Feature)}
+        assert features["published"].content == BODY
+        assert features["published"].draft_matches_content
+        assert features["edited"].draft_content == BODY + "More"
+        assert not features["edited"].draft_matches_content
+        assert features["empty"].content is None
+        assert db.query(ContentBlob).count() == 2
+        db.close()
+
+        connection = sqlite3.connect(brewing_dir / "database.db")
+        assert connection.execute(
+            "SELECT COUNT(*) FROM features WHERE content IS NOT NULL "
+            "OR draft_content IS NOT NULL"
+        ).fetchone() == (0,)
+        connection.close()
+
+    def test_is_idempotent(self, brewing_dir):
+        create_legacy_database(brewing_dir)
+        init_database(str(brewing_dir))
+        engine = init_database(str(brewing_dir))
+        db = sessionmaker(bind=engine)()
+        assert db.query(ContentBlob).count() == 2
+        db.close()
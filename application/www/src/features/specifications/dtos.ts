@@ -5,6 +5,7 @@ export interface Specification {
   summary?: string;
   content?: string;
   draft_content: string | null;
+  draft_matches_content: boolean;
   date_published?: string;
   date_created: string;
   date_updated: string;